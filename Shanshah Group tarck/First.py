@@ -13,7 +13,10 @@
 import streamlit as st
 import sqlite3
 import os
+import queue
 import random
+import tempfile
+from contextlib import contextmanager
 from datetime import datetime
 import pandas as pd
 import numpy as np
@@ -22,18 +25,25 @@ from base64 import b64encode
 # -------------------------
 # Config & DB
 # -------------------------
-st.set_page_config(page_title="Group Payment Tracker — Modern", layout="wide", page_icon="💳")
 st.set_page_config(page_title="Group Payment Tracker", layout="wide", page_icon="💳")
-# --- Convert logo to base64 (so it works locally & online)
-logo_path = "logo.png"
-logo_html = ""
 
-if os.path.exists(logo_path):
-    with open(logo_path, "rb") as f:
-        logo_base64 = b64encode(f.read()).decode()
-    logo_html = f'<img src="data:image/png;base64,{logo_base64}" style="width:250px; height:auto; border-radius:12px; margin-right:15px;">'
-else:
-    logo_html = "🖼️"
+# --- Convert logo to base64 (so it works locally & online).
+# cache_resource: the file read + base64 encode happens once per process,
+# not on every rerun.
+@st.cache_resource(show_spinner=False)
+def build_logo_html(path):
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            logo_base64 = b64encode(f.read()).decode()
+        return f'<img src="data:image/png;base64,{logo_base64}" style="width:250px; height:auto; border-radius:12px; margin-right:15px;">'
+    return "🖼️"
+
+logo_path = "logo.png"
+# Session-state gate on top of the process-wide cache_resource: reruns in
+# an existing session reuse the string without even a cache lookup.
+if "logo_html" not in st.session_state:
+    st.session_state.logo_html = build_logo_html(logo_path)
+logo_html = st.session_state.logo_html
 
 # --- Header layout ---
 st.markdown(f"""
@@ -59,40 +69,103 @@ st.markdown(f"""
 BASE_DIR = os.path.dirname(__file__)
 DB_FILE = os.path.join(BASE_DIR, "group_tracker.db")
 
-# persistent connection
-conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-c = conn.cursor()
+# Performance pragmas: WAL keeps readers unblocked while the app writes,
+# NORMAL sync + bigger cache + mmap cut per-write fsyncs and keep hot pages
+# resident. Best-effort — skip quietly on read-only/locked filesystems.
+_PRAGMAS = ("journal_mode=WAL", "synchronous=NORMAL", "temp_store=MEMORY",
+            "cache_size=-20000", "mmap_size=268435456", "foreign_keys=ON",
+            "cache_spill=OFF")
+
+def _connect(db_file):
+    # cached_statements keeps more compiled statements alive per connection,
+    # so the hot per-click UPDATEs skip the SQL parse/plan step.
+    conn = sqlite3.connect(db_file, check_same_thread=False, cached_statements=256)
+    for pragma in _PRAGMAS:
+        try:
+            conn.execute(f"PRAGMA {pragma}")
+        except sqlite3.Error:
+            pass
+    return conn
+
+class ConnectionPool:
+    """Small fixed-size pool of SQLite connections.
+
+    Streamlit runs each session's script on its own worker thread; handing
+    every helper its own pooled connection (each in WAL mode) lets sessions
+    read concurrently instead of serializing through one shared cursor.
+    """
+    def __init__(self, db_file, size=4):
+        self._pool = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._pool.put(_connect(db_file))
+
+    @contextmanager
+    def acquire(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
 
 # -------------------------
 # Schema (safe-create)
 # -------------------------
-c.execute("""
-CREATE TABLE IF NOT EXISTS members (
-    id INTEGER PRIMARY KEY,
-    name TEXT NOT NULL,
-    phone TEXT,
-    amount REAL DEFAULT 250
-)
-""")
-c.execute("""
-CREATE TABLE IF NOT EXISTS payments (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    member_id INTEGER,
-    month INTEGER,
-    year INTEGER,
-    status TEXT DEFAULT 'Unpaid',
-    amount REAL,
-    last_updated TEXT,
-    FOREIGN KEY(member_id) REFERENCES members(id)
-)
-""")
-c.execute("""
-CREATE TABLE IF NOT EXISTS meta (
-    key TEXT PRIMARY KEY,
-    value TEXT
-)
-""")
-conn.commit()
+def _init_schema(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS members (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL COLLATE NOCASE,
+        phone TEXT,
+        amount REAL DEFAULT 250
+    )
+    """)
+    # Every listing sorts by name COLLATE NOCASE; this index (also created on
+    # DBs predating the COLLATE in the DDL) lets SQLite skip the sort pass.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_members_name_nocase ON members(name COLLATE NOCASE)")
+    payments_ddl = """
+    CREATE TABLE IF NOT EXISTS payments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        member_id INTEGER,
+        month INTEGER,
+        year INTEGER,
+        status TEXT DEFAULT 'Unpaid',
+        amount REAL,
+        last_updated TEXT,
+        FOREIGN KEY(member_id) REFERENCES members(id) ON DELETE CASCADE
+    )
+    """
+    conn.execute(payments_ddl)
+    # Databases created before the FK gained ON DELETE CASCADE need a
+    # one-time table rebuild (SQLite can't alter a foreign key in place).
+    fk = conn.execute("PRAGMA foreign_key_list(payments)").fetchone()
+    if fk and fk[6] != "CASCADE":
+        conn.execute("PRAGMA foreign_keys=OFF")
+        with conn:
+            conn.execute("ALTER TABLE payments RENAME TO payments_old")
+            conn.execute(payments_ddl)
+            conn.execute("INSERT INTO payments SELECT * FROM payments_old")
+            conn.execute("DROP TABLE payments_old")
+        conn.execute("PRAGMA foreign_keys=ON")
+    # Hot queries filter on (member_id, month, year) or (month, year); without
+    # these indexes every lookup scans the whole payments history.
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_pay_m_my ON payments(member_id, year, month)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pay_my ON payments(year, month)")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    """)
+    conn.commit()
+
+@st.cache_resource(show_spinner=False)
+def get_pool():
+    p = ConnectionPool(DB_FILE)
+    with p.acquire() as conn:
+        _init_schema(conn)
+    return p
+
+pool = get_pool()
 
 # -------------------------
 # Helpers & DB functions (unchanged core logic)
@@ -107,89 +180,218 @@ def current_month_year_tuple():
 def current_month_label():
     return datetime.now().strftime("%B %Y")
 
-def generate_unique_id():
-    while True:
-        new_id = random.randint(10000, 99999)
-        c.execute("SELECT 1 FROM members WHERE id=?", (new_id,))
-        if not c.fetchone():
-            return new_id
+# Hot per-click statements as module constants: sqlite3's per-connection
+# statement cache keys on the statement text, so passing the same string
+# every call reuses the compiled plan instead of re-parsing it.
+SQL_MARK_PAID = "UPDATE payments SET status='Paid', last_updated=? WHERE member_id=? AND month=? AND year=?"
+SQL_MARK_UNPAID = "UPDATE payments SET status='Unpaid', last_updated=? WHERE member_id=? AND month=? AND year=?"
+SQL_UPDATE_MEMBER = "UPDATE members SET name=?, phone=?, amount=? WHERE id=?"
+SQL_SYNC_PAYMENT_AMOUNT = "UPDATE payments SET amount=?, last_updated=? WHERE member_id=? AND month=? AND year=?"
 
+@st.cache_data(ttl=60, show_spinner=False)
 def get_members_df():
-    return pd.read_sql_query("SELECT * FROM members ORDER BY name COLLATE NOCASE", conn)
+    with pool.acquire() as conn:
+        return pd.read_sql_query("SELECT * FROM members ORDER BY name COLLATE NOCASE", conn)
 
+@st.cache_data(ttl=60, show_spinner=False)
 def get_payments_df():
-    return pd.read_sql_query("""
-        SELECT p.id AS payment_id, p.member_id, m.name, p.month, p.year, p.status, p.amount, p.last_updated
-        FROM payments p LEFT JOIN members m ON p.member_id = m.id
-        ORDER BY p.year DESC, p.month DESC, m.name
-    """, conn)
+    # Only the columns callers actually display, and no global ORDER BY —
+    # the Logs tab re-sorts its own month slice, so a full-history temp
+    # sort B-tree here would be wasted work.
+    with pool.acquire() as conn:
+        return pd.read_sql_query("""
+            SELECT p.member_id, m.name, p.month, p.year, p.status, p.amount, p.last_updated
+            FROM payments p LEFT JOIN members m ON p.member_id = m.id
+        """, conn)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def current_month_payments_df():
+    month, year = current_month_year_tuple()
+    with pool.acquire() as conn:
+        return pd.read_sql_query("""
+            SELECT p.member_id, m.name, p.status, p.amount, p.last_updated
+            FROM payments p JOIN members m ON m.id = p.member_id
+            WHERE p.month=? AND p.year=?
+            ORDER BY m.name COLLATE NOCASE
+        """, conn, params=(month, year))
+
+def member_count():
+    with pool.acquire() as conn:
+        return conn.execute("SELECT COUNT(*) FROM members").fetchone()[0]
+
+def paid_count_for_month(month, year):
+    with pool.acquire() as conn:
+        return conn.execute("SELECT COUNT(*) FROM payments WHERE month=? AND year=? AND status='Paid'",
+                            (month, year)).fetchone()[0]
+
+def total_collected(month, year):
+    with pool.acquire() as conn:
+        return float(conn.execute("SELECT COALESCE(SUM(amount), 0) FROM payments WHERE month=? AND year=? AND status='Paid'",
+                                  (month, year)).fetchone()[0])
+
+def trend_df():
+    # SQLite aggregates per month and returns one row per month, instead of
+    # shipping the whole payments history into pandas for a groupby.
+    with pool.acquire() as conn:
+        return pd.read_sql_query("""
+            SELECT year, month, SUM(amount) AS amount
+            FROM payments WHERE status='Paid'
+            GROUP BY year, month ORDER BY year, month
+        """, conn)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def month_csv(month_label):
+    # Serialize a month's log once per selection instead of on every rerun;
+    # queries SQLite directly so only that month's rows are materialized.
+    dt = datetime.strptime(month_label, "%B %Y")
+    with pool.acquire() as conn:
+        df = pd.read_sql_query("""
+            SELECT p.member_id AS "Member ID", m.name AS "Name", p.status AS "Status",
+                   p.amount AS "Amount (Rs)", p.last_updated AS "Last Updated"
+            FROM payments p LEFT JOIN members m ON m.id = p.member_id
+            WHERE p.month=? AND p.year=?
+            ORDER BY p.status DESC, m.name COLLATE NOCASE
+        """, conn, params=(dt.month, dt.year))
+    return df.to_csv(index=False, lineterminator='\n').encode('utf-8')
+
+@st.cache_data(ttl=30, show_spinner=False)
+def backup_db_bytes():
+    # Snapshot through SQLite's online backup API: page-by-page copy that
+    # stays consistent while other connections write, unlike reading the
+    # raw file (which misses the WAL and can tear mid-transaction). The
+    # short TTL stops repeated clicks from re-copying the whole DB.
+    with pool.acquire() as conn:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        try:
+            dst = sqlite3.connect(path)
+            try:
+                conn.backup(dst)
+            finally:
+                dst.close()
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.unlink(path)
+
+def invalidate_df_caches():
+    # Call after any write so cached frames never serve stale data.
+    get_members_df.clear()
+    get_payments_df.clear()
+    current_month_payments_df.clear()
+    month_csv.clear()
 
 def add_member(name, phone, amount=250.0):
-    mid = generate_unique_id()
-    c.execute("INSERT INTO members (id, name, phone, amount) VALUES (?, ?, ?, ?)",
-              (mid, name, phone, float(amount)))
-    conn.commit()
+    global _ROLLOVER_KEY
+    _ROLLOVER_KEY = None
+    # Allocate the random 5-digit id in the same statement as the insert:
+    # ON CONFLICT rejects a colliding candidate and we just draw again
+    # (a retry needs an id clash, so it is rare even near capacity).
+    with pool.acquire() as conn:
+        while True:
+            mid = random.randint(10000, 99999)
+            row = conn.execute(
+                "INSERT INTO members (id, name, phone, amount) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO NOTHING RETURNING id",
+                (mid, name, phone, float(amount))).fetchone()
+            if row:
+                break
+        conn.commit()
     ensure_payments_for_member_month(mid)
+    invalidate_df_caches()
 
 def update_member(member_id, name, phone, amount):
-    c.execute("UPDATE members SET name=?, phone=?, amount=? WHERE id=?",
-              (name, phone, float(amount), member_id))
-    conn.commit()
     month, year = current_month_year_tuple()
-    c.execute("UPDATE payments SET amount=?, last_updated=? WHERE member_id=? AND month=? AND year=?",
-              (float(amount), now_str(), member_id, month, year))
-    conn.commit()
+    with pool.acquire() as conn:
+        # sqlite3's connection context manager wraps both UPDATEs in one
+        # transaction: a single fsync, and the member row can never be
+        # saved with this month's payment amount left stale.
+        with conn:
+            conn.execute(SQL_UPDATE_MEMBER, (name, phone, float(amount), member_id))
+            conn.execute(SQL_SYNC_PAYMENT_AMOUNT, (float(amount), now_str(), member_id, month, year))
+    invalidate_df_caches()
 
 def delete_member(member_id):
-    c.execute("DELETE FROM payments WHERE member_id=?", (member_id,))
-    c.execute("DELETE FROM members WHERE id=?", (member_id,))
-    conn.commit()
+    # payments rows go with the member via ON DELETE CASCADE
+    with pool.acquire() as conn:
+        with conn:
+            conn.execute("DELETE FROM members WHERE id=?", (member_id,))
+    invalidate_df_caches()
 
 def clear_all_data():
-    c.execute("DELETE FROM payments")
-    c.execute("DELETE FROM members")
-    try:
-        c.execute("DELETE FROM sqlite_sequence WHERE name='payments'")
-    except Exception:
-        pass
-    conn.commit()
+    global _ROLLOVER_KEY
+    _ROLLOVER_KEY = None
+    with pool.acquire() as conn:
+        with conn:
+            conn.execute("DELETE FROM payments")
+            conn.execute("DELETE FROM members")
+            try:
+                conn.execute("DELETE FROM sqlite_sequence WHERE name='payments'")
+            except Exception:
+                pass
+    invalidate_df_caches()
+
+# (month, year) the rollover last ran for in this process; lets the
+# per-render ensure_payments_for_month() calls short-circuit for free.
+_ROLLOVER_KEY = None
 
 def ensure_payments_for_month():
+    # One SELECT for existing rows + one executemany inside a single
+    # transaction: one fsync total instead of one per member.
+    global _ROLLOVER_KEY
     month, year = current_month_year_tuple()
-    members = c.execute("SELECT id, amount FROM members").fetchall()
-    for mid, amt in members:
-        c.execute("SELECT 1 FROM payments WHERE member_id=? AND month=? AND year=?", (mid, month, year))
-        if not c.fetchone():
-            c.execute("INSERT INTO payments (member_id, month, year, status, amount, last_updated) VALUES (?, ?, ?, ?, ?, ?)",
-                      (mid, month, year, "Unpaid", float(amt), now_str()))
-    conn.commit()
+    if _ROLLOVER_KEY == (month, year):
+        return
+    ts = now_str()
+    with pool.acquire() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = {r[0] for r in conn.execute(
+                "SELECT member_id FROM payments WHERE month=? AND year=?", (month, year))}
+            members = conn.execute("SELECT id, amount FROM members").fetchall()
+            rows = [(mid, month, year, "Unpaid", float(amt), ts)
+                    for mid, amt in members if mid not in existing]
+            if rows:
+                conn.executemany(
+                    "INSERT INTO payments (member_id, month, year, status, amount, last_updated) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    _ROLLOVER_KEY = (month, year)
+    if rows:
+        invalidate_df_caches()
 
 def ensure_payments_for_member_month(member_id):
+    # Single statement: the unique idx_pay_m_my index makes OR IGNORE a
+    # no-op when this month's row already exists.
     month, year = current_month_year_tuple()
-    c.execute("SELECT 1 FROM payments WHERE member_id=? AND month=? AND year=?", (member_id, month, year))
-    if not c.fetchone():
-        c.execute("SELECT amount FROM members WHERE id=?", (member_id,))
-        row = c.fetchone()
-        amt = float(row[0]) if row else 250.0
-        c.execute("INSERT INTO payments (member_id, month, year, status, amount, last_updated) VALUES (?, ?, ?, ?, ?, ?)",
-                  (member_id, month, year, "Unpaid", amt, now_str()))
+    with pool.acquire() as conn:
+        conn.execute("""
+            INSERT OR IGNORE INTO payments (member_id, month, year, status, amount, last_updated)
+            SELECT id, ?, ?, 'Unpaid', amount, ? FROM members WHERE id=?
+        """, (month, year, now_str(), member_id))
         conn.commit()
 
 def mark_paid_for_member_current_month(member_id):
     month, year = current_month_year_tuple()
-    c.execute("UPDATE payments SET status='Paid', last_updated=? WHERE member_id=? AND month=? AND year=?",
-              (now_str(), member_id, month, year))
-    conn.commit()
+    with pool.acquire() as conn:
+        conn.execute(SQL_MARK_PAID, (now_str(), member_id, month, year))
+        conn.commit()
+    invalidate_df_caches()
 
 def ensure_monthly_rollover():
     month, year = current_month_year_tuple()
-    last = c.execute("SELECT value FROM meta WHERE key='last_run_month'").fetchone()
+    with pool.acquire() as conn:
+        last = conn.execute("SELECT value FROM meta WHERE key='last_run_month'").fetchone()
     last_val = last[0] if last else None
     cur_val = f"{month:02d}-{year}"
     if last_val != cur_val:
         ensure_payments_for_month()
-        c.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_run_month', ?)", (cur_val,))
-        conn.commit()
+        with pool.acquire() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_run_month', ?)", (cur_val,))
+            conn.commit()
 
 # init
 ensure_monthly_rollover()
@@ -197,8 +399,9 @@ ensure_monthly_rollover()
 # -------------------------
 # Modern Dark Futuristic CSS + small animations
 # -------------------------
-st.markdown(
-    """
+@st.cache_resource(show_spinner=False)
+def app_css():
+    return """
     <style>
     :root{
       --bg1: #05060a;
@@ -266,8 +469,9 @@ st.markdown(
     table.dataframe td, table.dataframe th { color: #e6eef6; }
 
     </style>
-    """, unsafe_allow_html=True
-)
+    """
+
+st.markdown(app_css(), unsafe_allow_html=True)
 
 # -------------------------
 # Header / Hero
@@ -287,12 +491,9 @@ with col_h1:
                 </div>
             </div>""", unsafe_allow_html=True)
 with col_h2:
-    # quick collected metric card
-    payments_all = get_payments_df()
-    collected_now = 0
+    # quick collected metric card — one SQL scalar, no DataFrame needed
     month, year = current_month_year_tuple()
-    if not payments_all.empty:
-        collected_now = int(payments_all[(payments_all['month'] == month) & (payments_all['year'] == year) & (payments_all['status']=='Paid')]['amount'].sum() or 0)
+    collected_now = int(total_collected(month, year))
     st.markdown(f"<div class='card'><div class='muted'>Collected (this month)</div><h3>Rs {collected_now}</h3></div>", unsafe_allow_html=True)
 
 # -------------------------
@@ -315,7 +516,8 @@ if page == "Members (Public)":
         WHERE p.month=? AND p.year=?
         ORDER BY m.name COLLATE NOCASE
     """
-    rows = c.execute(q, (month, year)).fetchall()
+    with pool.acquire() as db:
+        rows = db.execute(q, (month, year)).fetchall()
     if not rows:
         st.info("No payment records for this month. Admin can add members.")
     else:
@@ -325,25 +527,27 @@ if page == "Members (Public)":
         pct = int((paid_count / total_members) * 100) if total_members else 0
         st.markdown(f"<div class='card'><div class='muted'>This month progress</div><h3 style='margin:6px 0'>{pct}% collected</h3><div class='muted' style='margin-bottom:8px'>Paid: {paid_count} · Members: {total_members}</div><div class='progress-wrap'><div class='progress-bar' style='width:{pct}%;'></div></div></div>", unsafe_allow_html=True)
 
-        cols = st.columns(2)
-        for i, (member_id, name, phone, status, amount, last_updated) in enumerate(rows):
-            col = cols[i % 2]
-            badge = "<span class='badge-paid'>Paid</span>" if status == "Paid" else "<span class='badge-unpaid'>Unpaid</span>"
-            col.markdown(f"""
-                <div class='card' style='margin-bottom:12px;'>
-                  <div style="display:flex; justify-content:space-between; align-items:center">
-                    <div>
-                      <h4 style="margin:0">{name} <small class='muted'>({member_id})</small></h4>
-                      <div class="muted" style="margin-top:6px">📞 {phone or '-'}</div>
-                    </div>
-                    <div style="text-align:right">
-                      <div style="margin-bottom:6px">{badge}</div>
-                      <div class="muted">Rs {int(amount)}</div>
-                      <div class="muted" style="font-size:12px; margin-top:6px;">{last_updated or '-'}</div>
-                    </div>
-                  </div>
+        # Build all card HTML up front and emit it in one st.markdown call:
+        # a single component round-trip to the browser instead of one per card.
+        BADGES = {"Paid": "<span class='badge-paid'>Paid</span>",
+                  "Unpaid": "<span class='badge-unpaid'>Unpaid</span>"}
+        cards = "".join(f"""
+            <div class='card'>
+              <div style="display:flex; justify-content:space-between; align-items:center">
+                <div>
+                  <h4 style="margin:0">{name} <small class='muted'>({member_id})</small></h4>
+                  <div class="muted" style="margin-top:6px">📞 {phone or '-'}</div>
                 </div>
-            """, unsafe_allow_html=True)
+                <div style="text-align:right">
+                  <div style="margin-bottom:6px">{BADGES.get(status, BADGES['Unpaid'])}</div>
+                  <div class="muted">Rs {int(amount)}</div>
+                  <div class="muted" style="font-size:12px; margin-top:6px;">{last_updated or '-'}</div>
+                </div>
+              </div>
+            </div>
+        """ for member_id, name, phone, status, amount, last_updated in rows)
+        st.markdown(f"<div style='display:grid; grid-template-columns:1fr 1fr; gap:12px'>{cards}</div>",
+                    unsafe_allow_html=True)
 
 # -------------------------
 # Admin (password protected)
@@ -367,49 +571,50 @@ elif page == "Admin":
     st.markdown("## 🔒 Admin Panel")
     tab = st.radio("Menu", ["Dashboard", "Members", "Logs", "Settings"], horizontal=True)
 
+    # Each tab body is an st.fragment: a widget interaction inside a tab
+    # reruns just that fragment, not the whole script (header, CSS, other
+    # panels), so admin clicks stop re-firing unrelated queries.
     # ---------------- Dashboard ----------------
-    if tab == "Dashboard":
+    @st.fragment
+    def render_dashboard():
         ensure_payments_for_month()
         st.markdown("### Dashboard — Overview")
         month, year = current_month_year_tuple()
-        payments_df = get_payments_df()
-        members_df = get_members_df()
 
-        total_members = len(members_df)
-        paid_count = len(payments_df[(payments_df['month']==month) & (payments_df['year']==year) & (payments_df['status']=='Paid')])
+        # Metric cards come straight from SQL scalars — no full-history
+        # DataFrame needed just to render four numbers.
+        total_members = member_count()
+        paid_count = paid_count_for_month(month, year)
         unpaid_count = total_members - paid_count
-        collected = int(payments_df[(payments_df['month']==month) & (payments_df['year']==year) & (payments_df['status']=='Paid')]['amount'].sum() or 0)
+        collected = int(total_collected(month, year))
 
-        a,b,c,d = st.columns(4)
+        a,b,col_c,d = st.columns(4)
         a.metric("Members", total_members)
         b.metric("Paid", paid_count)
-        c.metric("Unpaid", unpaid_count)
+        col_c.metric("Unpaid", unpaid_count)
         d.metric("Collected (this month)", f"Rs {collected}")
 
         st.markdown("---")
-        # Trend chart: total collected per month
-        if payments_df.empty:
-            st.info("No payment records yet.")
+        # Trend chart: total collected per month (aggregated in SQLite)
+        trend = trend_df()
+        if trend.empty:
+            st.info("No paid records yet to show trend.")
         else:
-            payments_df['month_label'] = payments_df.apply(lambda r: datetime(int(r['year']), int(r['month']), 1).strftime("%b %Y"), axis=1)
-            trend = payments_df[payments_df['status']=='Paid'].groupby('month_label')['amount'].sum().reset_index()
-            trend = trend.sort_values(by='month_label')
-            if trend.empty:
-                st.info("No paid records yet to show trend.")
-            else:
-                st.markdown("**Trend — Collected per month**")
-                st.line_chart(data=trend.set_index('month_label')['amount'])
+            trend['month_label'] = pd.to_datetime(dict(year=trend['year'], month=trend['month'], day=1)).dt.strftime("%b %Y")
+            st.markdown("**Trend — Collected per month**")
+            st.line_chart(data=trend.set_index('month_label')['amount'])
 
         st.markdown("---")
         st.markdown("**Recent Payments (this month)**")
-        recent = payments_df[(payments_df['month']==month) & (payments_df['year']==year)].sort_values('last_updated', ascending=False)
+        recent = current_month_payments_df().sort_values('last_updated', ascending=False)
         if recent.empty:
             st.info("No records this month.")
         else:
             st.dataframe(recent[['member_id','name','status','amount','last_updated']].rename(columns={'member_id':'ID','name':'Name','status':'Status','amount':'Amount','last_updated':'Updated'}), use_container_width=True)
 
     # ---------------- Members (admin add/edit) ----------------
-    elif tab == "Members":
+    @st.fragment
+    def render_members_admin():
         st.markdown("### 👥 Members — Add / Edit")
         ensure_payments_for_month()
         members_df = get_members_df()
@@ -438,8 +643,10 @@ elif page == "Admin":
         if members_df.empty:
             st.info("No members yet.")
         else:
-            sel = st.selectbox("Select member", [f"{r['id']} — {r['name']}" for _, r in members_df.iterrows()], key="admin_edit_sel")
-            sel_id = int(sel.split("—")[0].strip())
+            # Vectorized label build — iterrows boxes every row into a Series
+            labels = (members_df['id'].astype(str) + " — " + members_df['name']).tolist()
+            sel = st.selectbox("Select member", labels, key="admin_edit_sel")
+            sel_id = int(sel.split(" — ", 1)[0])
             rec = members_df[members_df['id'] == sel_id].iloc[0]
 
             with st.form("edit_form"):
@@ -460,16 +667,18 @@ elif page == "Admin":
             act1, act2 = st.columns(2)
             # Get current payment status for this month
             month, year = current_month_year_tuple()
-            cur_status = c.execute("SELECT status FROM payments WHERE member_id=? AND month=? AND year=?",
-                       (sel_id, month, year)).fetchone()
+            with pool.acquire() as db:
+                cur_status = db.execute("SELECT status FROM payments WHERE member_id=? AND month=? AND year=?",
+                                        (sel_id, month, year)).fetchone()
             cur_status = cur_status[0] if cur_status else "Unpaid"
             # Toggle button
             with act1:
                 if cur_status == "Paid":
                     if st.button("🔁 Mark as Unpaid", key=f"unpaid_{sel_id}"):
-                        c.execute("UPDATE payments SET status='Unpaid', last_updated=? WHERE member_id=? AND month=? AND year=?",
-                            (now_str(), sel_id, month, year))
-                        conn.commit()
+                        with pool.acquire() as db:
+                            db.execute(SQL_MARK_UNPAID, (now_str(), sel_id, month, year))
+                            db.commit()
+                        invalidate_df_caches()
                         st.warning("Marked as Unpaid ❌")
                         ensure_payments_for_month()
                 else:
@@ -498,49 +707,55 @@ elif page == "Admin":
 
             # member history
             st.markdown("Member payment history")
-            hist = pd.read_sql_query("""
-                SELECT p.month, p.year, p.status, p.amount, p.last_updated
-                FROM payments p
-                WHERE p.member_id=?
-                ORDER BY p.year DESC, p.month DESC
-            """, conn, params=(sel_id,))
+            with pool.acquire() as db:
+                hist = pd.read_sql_query(
+                    "SELECT month, year, status, amount, last_updated "
+                    "FROM payments WHERE member_id=? ORDER BY year DESC, month DESC",
+                    db, params=(sel_id,))
             if hist.empty:
                 st.info("No history for this member.")
             else:
-                hist['Month'] = hist.apply(lambda r: datetime(int(r['year']), int(r['month']), 1).strftime("%B %Y"), axis=1)
+                hist['Month'] = pd.to_datetime(dict(year=hist['year'], month=hist['month'], day=1)).dt.strftime("%B %Y")
                 hist_display = hist[['Month','status','amount','last_updated']].rename(columns={'status':'Status','amount':'Amount (Rs)','last_updated':'Last Updated'})
                 st.dataframe(hist_display, use_container_width=True)
 
     # ---------------- Logs ----------------
-    elif tab == "Logs":
+    @st.fragment
+    def render_logs():
         st.markdown("### 🧾 Monthly Logs")
         payments_df = get_payments_df()
         if payments_df.empty:
             st.info("No payments recorded yet.")
         else:
-            payments_df['month_label'] = payments_df.apply(lambda r: datetime(int(r['year']), int(r['month']), 1).strftime("%B %Y"), axis=1)
-            months = payments_df['month_label'].unique().tolist()
+            payments_df['month_label'] = pd.to_datetime(dict(year=payments_df['year'], month=payments_df['month'], day=1)).dt.strftime("%B %Y")
+            months = (payments_df[['year', 'month', 'month_label']]
+                      .drop_duplicates()
+                      .sort_values(['year', 'month'], ascending=False)['month_label'].tolist())
             sel_month = st.selectbox("Select month", months, index=0)
             grp = payments_df[payments_df['month_label'] == sel_month]
-            total_collected = int(grp[grp['status']=='Paid']['amount'].sum() or 0)
+            collected_month = int(grp[grp['status']=='Paid']['amount'].sum() or 0)
             total_members_month = grp['member_id'].nunique()
             paid_count = len(grp[grp['status']=='Paid'])
             unpaid_count = len(grp[grp['status']=='Unpaid'])
 
-            st.markdown(f"<div class='card'><div class='muted'>Records for</div><h3 style='margin:4px 0'>{sel_month}</h3><div class='muted'>Members: {total_members_month} · Paid: {paid_count} · Unpaid: {unpaid_count}</div><h2 style='margin-top:8px;'>Collected: Rs {total_collected}</h2></div>", unsafe_allow_html=True)
+            st.markdown(f"<div class='card'><div class='muted'>Records for</div><h3 style='margin:4px 0'>{sel_month}</h3><div class='muted'>Members: {total_members_month} · Paid: {paid_count} · Unpaid: {unpaid_count}</div><h2 style='margin-top:8px;'>Collected: Rs {collected_month}</h2></div>", unsafe_allow_html=True)
             st.markdown("---")
             disp = grp[['member_id','name','status','amount','last_updated']].rename(columns={'member_id':'Member ID','name':'Name','status':'Status','amount':'Amount (Rs)','last_updated':'Last Updated'})
             st.dataframe(disp.sort_values(['Status','Name'], ascending=[False, True]), use_container_width=True)
-            csv_bytes = disp.to_csv(index=False).encode('utf-8')
+            csv_bytes = month_csv(sel_month)
             st.download_button("Download CSV for this month", data=csv_bytes, file_name=f"payments_{sel_month.replace(' ','_')}.csv", mime="text/csv")
 
+    if tab == "Dashboard":
+        render_dashboard()
+    elif tab == "Members":
+        render_members_admin()
+    elif tab == "Logs":
+        render_logs()
     # ---------------- Settings ----------------
     elif tab == "Settings":
         st.markdown("### ⚙️ Settings & Maintenance")
-        if st.button("📥 Download DB Backup"):
-            with open(DB_FILE, "rb") as f:
-                dbdata = f.read()
-            st.download_button("Download group_tracker.db", data=dbdata, file_name="group_tracker.db")
+        if st.button("📥 Prepare DB Backup"):
+            st.download_button("Download group_tracker.db", data=backup_db_bytes(), file_name="group_tracker.db")
 
         st.markdown("#### ⚠️ Danger Zone")
         confirm = st.checkbox("I understand this will permanently delete all records.")
@@ -552,6 +767,5 @@ elif page == "Admin":
             st.session_state.admin_logged_in = False
             st.success("Logged out.")
 
-# End (DB remains open; Streamlit process covers lifecycle)
-# conn.close()
+# End (pooled connections remain open; Streamlit process covers lifecycle)
 